@@ -1,17 +1,29 @@
 import os
 
-from dotenv import load_dotenv
+# Production injects env vars directly; only parse a local .env when they are missing.
+if not os.environ.get("SUPABASE_URL"):
+    from dotenv import load_dotenv
 
-load_dotenv()
+    load_dotenv()
 
 ODDS_API_KEY = os.environ.get("ODDS_API_KEY")
 ODDS_API_BASE_URL = "https://api.the-odds-api.com/v4"
 ODDS_API_TIMEOUT_SECONDS = 30
 ODDS_API_REGION = "us"
 ODDS_API_FORMAT = "american"
+ODDS_API_MAX_CONCURRENCY = 8
+ODDS_API_STREAM_CHUNK_BYTES = 4096
 
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
+SUPABASE_JWT_SECRET = os.environ.get("SUPABASE_JWT_SECRET")
+AUTH_TOKEN_CACHE_SIZE = 4096
+SUPABASE_TIMEOUT_SECONDS = 30
+SUPABASE_MAX_CONNECTIONS = 16
+REDIS_URL = os.environ.get("REDIS_URL")
+ARBITRAGE_CACHE_PREFIX = "arb"
+ARBITRAGE_CACHE_TTL_SECONDS = 30
+ARBITRAGE_CACHE_LOCAL_MAX_SIZE = 256
 CORS_ALLOW_ORIGINS = [
     origin.strip()
     for origin in os.environ.get(
@@ -22,10 +34,23 @@ CORS_ALLOW_ORIGINS = [
 
 MONEYLINE_ARBITRAGE_TABLE = "moneyline_arbitrage_opportunities"
 MONEYLINE_CONFLICT_KEYS = "game_id,over_book,under_book"
+MONEYLINE_SELECT_COLUMNS = (
+    "game_id,home_team,away_team,over_book,under_book,"
+    "over_odds,under_odds,profit_percent,detected_at"
+)
 PROP_ARBITRAGE_TABLE = "prop_arbitrage_opportunities"
 PROP_CONFLICT_KEYS = (
     "game_id,market_type,player_name,line_value,over_book,under_book"
 )
+PROP_SELECT_COLUMNS = (
+    "game_id,market_type,player_name,line_value,home_team,away_team,"
+    "over_book,under_book,over_odds,under_odds,profit_percent,detected_at"
+)
+ARBITRAGE_PAGE_SIZE_DEFAULT = 100
+ARBITRAGE_PAGE_SIZE_MAX = 1000
+SEEN_ROWS_MAX_SIZE = 10000
+UPSERT_CHUNK_SIZE = 500
+UPSERT_MAX_WORKERS = 4
 
 SPORT_KEY_ALIASES = {
     "nhl": "icehockey_nhl",
@@ -49,6 +74,16 @@ PROP_MARKETS_BY_SPORT = {
     ],
 }
 
+# Prop markets keyed by both canonical sport keys and their aliases, so lookups skip alias resolution.
+RESOLVED_PROP_MARKETS = {
+    **{
+        alias: PROP_MARKETS_BY_SPORT[resolved]
+        for alias, resolved in SPORT_KEY_ALIASES.items()
+        if resolved in PROP_MARKETS_BY_SPORT
+    },
+    **PROP_MARKETS_BY_SPORT,
+}
+
 
 def resolve_sport_key(sport_key):
     """
@@ -63,6 +98,6 @@ def get_prop_markets(sport_key):
     """
     Input: sport_key (str)
     Output: list[str]
-    Get configured prop market keys for a sport after alias resolution. Return an empty list when no markets are configured.
+    Get configured prop market keys for a sport or sport alias with a single precomputed lookup. Return an empty list when no markets are configured.
     """
-    return PROP_MARKETS_BY_SPORT.get(resolve_sport_key(sport_key), [])
+    return RESOLVED_PROP_MARKETS.get(sport_key, [])
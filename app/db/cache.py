@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+
+import orjson
+import redis
+
+from app.config import (
+    ARBITRAGE_CACHE_LOCAL_MAX_SIZE,
+    ARBITRAGE_CACHE_PREFIX,
+    ARBITRAGE_CACHE_TTL_SECONDS,
+    REDIS_URL,
+)
+
+_redis = redis.Redis.from_url(REDIS_URL) if REDIS_URL else None
+
+# Per-process LRU fallback used when REDIS_URL is not configured.
+_local_cache = OrderedDict()
+_local_cache_lock = threading.Lock()
+
+
+def _cache_key(namespace, key):
+    """
+    Input: namespace (str), key (str)
+    Output: str
+    Build the fully qualified cache key for a namespace entry.
+    """
+    return f"{ARBITRAGE_CACHE_PREFIX}:{namespace}:{key}"
+
+
+def get_cached(namespace, key):
+    """
+    Input: namespace (str), key (str)
+    Output: list | dict | None
+    Read a cached response body for a namespace entry. Return `None` on a miss, an expired entry, or an unreachable Redis so callers fall back to Supabase.
+    """
+    cache_key = _cache_key(namespace, key)
+    if _redis is None:
+        with _local_cache_lock:
+            entry = _local_cache.get(cache_key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del _local_cache[cache_key]
+                return None
+            _local_cache.move_to_end(cache_key)
+        return entry[1]
+
+    try:
+        payload = _redis.get(cache_key)
+    except redis.RedisError:
+        return None
+    return orjson.loads(payload) if payload is not None else None
+
+
+def set_cached(namespace, key, value):
+    """
+    Input: namespace (str), key (str), value (list | dict)
+    Output: None
+    Store a response body for a namespace entry with the configured TTL. The local fallback evicts the least recently used entries past its size cap, and Redis write failures are ignored so reads never fail because of the cache.
+    """
+    cache_key = _cache_key(namespace, key)
+    if _redis is None:
+        with _local_cache_lock:
+            _local_cache[cache_key] = (time.monotonic() + ARBITRAGE_CACHE_TTL_SECONDS, value)
+            _local_cache.move_to_end(cache_key)
+            while len(_local_cache) > ARBITRAGE_CACHE_LOCAL_MAX_SIZE:
+                _local_cache.popitem(last=False)
+        return
+
+    try:
+        _redis.setex(cache_key, ARBITRAGE_CACHE_TTL_SECONDS, orjson.dumps(value))
+    except redis.RedisError:
+        pass
+
+
+def invalidate(namespace):
+    """
+    Input: namespace (str)
+    Output: None
+    Drop every cached entry for a namespace after its underlying table changes.
+    """
+    prefix = _cache_key(namespace, "")
+    if _redis is None:
+        with _local_cache_lock:
+            for cache_key in [k for k in _local_cache if k.startswith(prefix)]:
+                del _local_cache[cache_key]
+        return
+
+    try:
+        cache_keys = list(_redis.scan_iter(match=f"{prefix}*"))
+        if cache_keys:
+            _redis.delete(*cache_keys)
+    except redis.RedisError:
+        pass
@@ -1,115 +1,267 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 
-from supabase import create_client
+import httpx
+import orjson
+from postgrest import ReturnMethod
+from supabase import ClientOptions, create_client
 
 from app.config import (
     MONEYLINE_ARBITRAGE_TABLE,
     MONEYLINE_CONFLICT_KEYS,
     PROP_ARBITRAGE_TABLE,
     PROP_CONFLICT_KEYS,
+    SEEN_ROWS_MAX_SIZE,
     SUPABASE_KEY,
+    SUPABASE_MAX_CONNECTIONS,
+    SUPABASE_TIMEOUT_SECONDS,
     SUPABASE_URL,
+    UPSERT_CHUNK_SIZE,
+    UPSERT_MAX_WORKERS,
 )
+from app.db import cache
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in environment.")
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+class _OrjsonClient(httpx.Client):
+    """
+    httpx client that encodes `json=` request bodies with orjson instead of the stdlib encoder.
+    """
+
+    def build_request(self, method, url, *, json=None, content=None, headers=None, **kwargs):
+        """
+        Input: method (str), url (str), json (Any | None), content (bytes | None), headers (HeaderTypes | None), **kwargs
+        Output: httpx.Request
+        Build the outgoing request, serializing a `json=` body with orjson into raw content. Keep the JSON content type so PostgREST parses the body as before.
+        """
+        if json is not None and content is None:
+            content = orjson.dumps(json)
+            headers = httpx.Headers(headers)
+            headers.setdefault("Content-Type", "application/json")
+            json = None
+        return super().build_request(method, url, content=content, json=json, headers=headers, **kwargs)
+
 
-def _format_moneyline_opportunity(event):
+# One long-lived HTTP/2 client shared by PostgREST and auth, so upserts and reads
+# reuse pooled keep-alive connections (httpx negotiates gzip by default).
+_http_client = _OrjsonClient(
+    http2=True,
+    timeout=SUPABASE_TIMEOUT_SECONDS,
+    limits=httpx.Limits(
+        max_connections=SUPABASE_MAX_CONNECTIONS,
+        max_keepalive_connections=SUPABASE_MAX_CONNECTIONS,
+    ),
+    follow_redirects=True,
+)
+
+supabase = create_client(
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    options=ClientOptions(httpx_client=_http_client),
+)
+
+_upsert_executor = ThreadPoolExecutor(max_workers=UPSERT_MAX_WORKERS)
+
+# Fingerprints of rows this process has already upserted, keyed by table + conflict key.
+_seen_rows = OrderedDict()
+_seen_rows_lock = threading.Lock()
+
+def _format_moneyline_opportunity(event, detected_at):
     """
-    Input: event (dict)
+    Input: event (MoneylineOpp), detected_at (str)
     Output: dict
-    Transform a moneyline arbitrage event into the Supabase table row shape. Add a UTC timestamp so each upsert records when the opportunity was detected.
+    Transform a moneyline arbitrage event into the Supabase table row shape. Stamp it with the batch-level UTC detection time computed by the caller.
     """
     return {
-        "game_id": event["game_id"],
-        "home_team": event.get("home_team"),
-        "away_team": event.get("away_team"),
-        "over_book": event["over_book"],
-        "under_book": event["under_book"],
-        "over_odds": event["over_odds"],
-        "under_odds": event["under_odds"],
-        "profit_percent": event["profit_percent"],
-        "detected_at": datetime.now(timezone.utc).isoformat(),
+        "game_id": event.game_id,
+        "home_team": event.home_team,
+        "away_team": event.away_team,
+        "over_book": event.over_book,
+        "under_book": event.under_book,
+        "over_odds": event.over_odds,
+        "under_odds": event.under_odds,
+        "profit_percent": event.profit_percent,
+        "detected_at": detected_at,
     }
 
 
-def _format_prop_opportunity(event):
+def _format_prop_opportunity(event, detected_at):
     """
-    Input: event (dict)
+    Input: event (PropOpp), detected_at (str)
     Output: dict
-    Transform a prop arbitrage event into the Supabase table row shape. Add a UTC timestamp so each upsert records when the opportunity was detected.
+    Transform a prop arbitrage event into the Supabase table row shape. Stamp it with the batch-level UTC detection time computed by the caller.
     """
     return {
-        "game_id": event["game_id"],
-        "market_type": event["market_type"],
-        "player_name": event.get("player_name"),
-        "line_value": event.get("line_value"),
-        "home_team": event.get("home_team"),
-        "away_team": event.get("away_team"),
-        "over_book": event["over_book"],
-        "under_book": event["under_book"],
-        "over_odds": event["over_odds"],
-        "under_odds": event["under_odds"],
-        "profit_percent": event["profit_percent"],
-        "detected_at": datetime.now(timezone.utc).isoformat(),
+        "game_id": event.game_id,
+        "market_type": event.market_type,
+        "player_name": event.player_name,
+        "line_value": event.line_value,
+        "home_team": event.home_team,
+        "away_team": event.away_team,
+        "over_book": event.over_book,
+        "under_book": event.under_book,
+        "over_odds": event.over_odds,
+        "under_odds": event.under_odds,
+        "profit_percent": event.profit_percent,
+        "detected_at": detected_at,
     }
 
 
-def upsert_moneyline_opportunities(opportunities, min_profit_percent=1.99):
+def _build_rows(formatter, opportunities, min_profit_percent, detected_at=None):
     """
-    Input: opportunities (list[dict]), min_profit_percent (float)
+    Input: formatter (callable), opportunities (list[MoneylineOpp | PropOpp]), min_profit_percent (float), detected_at (str | None)
     Output: list[dict]
-    Filter and upsert moneyline opportunities that meet the minimum profit threshold. Return the rows sent to Supabase, or an empty list when nothing qualifies.
+    Format the opportunities that meet the minimum profit threshold into table rows. Read the clock once per batch when no detection time is supplied.
     """
-    rows = [
-        _format_moneyline_opportunity(opp)
+    if detected_at is None:
+        detected_at = datetime.now(timezone.utc).isoformat()
+    return [
+        formatter(opp, detected_at)
         for opp in opportunities
-        if opp["profit_percent"] >= min_profit_percent
+        if opp.profit_percent >= min_profit_percent
     ]
-    if not rows:
-        return []
 
-    (
-        supabase.table(MONEYLINE_ARBITRAGE_TABLE)
-        .upsert(rows, on_conflict=MONEYLINE_CONFLICT_KEYS)
-        .execute()
-    )
-    return rows
 
+def _row_fingerprint(table_name, row, key_columns):
+    """
+    Input: table_name (str), row (dict), key_columns (list[str])
+    Output: tuple[tuple, int]
+    Build the dedup key for a row from its table and conflict columns, paired with a hash of its odds and profit. Two rows with the same key and hash would produce a no-op upsert.
+    """
+    key = (table_name, *(row[column] for column in key_columns))
+    return key, hash((row["over_odds"], row["under_odds"], row["profit_percent"]))
 
-def upsert_prop_opportunities(opportunities, min_profit_percent=1.99):
+
+def _filter_unchanged_rows(table_name, rows, conflict_keys):
     """
-    Input: opportunities (list[dict]), min_profit_percent (float)
+    Input: table_name (str), rows (list[dict]), conflict_keys (str)
     Output: list[dict]
-    Filter and upsert prop opportunities that meet the minimum profit threshold. Return the rows sent to Supabase, or an empty list when nothing qualifies.
+    Drop rows whose odds match what this process last upserted for the same conflict key. Return only rows that still need to be written.
     """
-    rows = [
-        _format_prop_opportunity(opp)
-        for opp in opportunities
-        if opp["profit_percent"] >= min_profit_percent
-    ]
+    key_columns = conflict_keys.split(",")
+    changed_rows = []
+    with _seen_rows_lock:
+        for row in rows:
+            key, odds_hash = _row_fingerprint(table_name, row, key_columns)
+            if _seen_rows.get(key) != odds_hash:
+                changed_rows.append(row)
+    return changed_rows
 
-    if not rows:
-        return []
 
+def _remember_rows(table_name, rows, conflict_keys):
+    """
+    Input: table_name (str), rows (list[dict]), conflict_keys (str)
+    Output: None
+    Record fingerprints for rows that were just upserted, evicting the least recently written keys once the cache is full.
+    """
+    key_columns = conflict_keys.split(",")
+    with _seen_rows_lock:
+        for row in rows:
+            key, odds_hash = _row_fingerprint(table_name, row, key_columns)
+            _seen_rows[key] = odds_hash
+            _seen_rows.move_to_end(key)
+        while len(_seen_rows) > SEEN_ROWS_MAX_SIZE:
+            _seen_rows.popitem(last=False)
+
+
+def _upsert_chunk(table_name, rows, conflict_keys):
+    """
+    Input: table_name (str), rows (list[dict]), conflict_keys (str)
+    Output: None
+    Send one bounded chunk of rows to Supabase as a single upsert request.
+    """
     (
-        supabase.table(PROP_ARBITRAGE_TABLE)
-        .upsert(rows, on_conflict=PROP_CONFLICT_KEYS)
+        supabase.table(table_name)
+        .upsert(rows, on_conflict=conflict_keys, returning=ReturnMethod.minimal)
         .execute()
     )
-    return rows
+
+
+def _upsert_batches(batches):
+    """
+    Input: batches (list[tuple[str, list[dict], str]])
+    Output: list[list[dict]]
+    Upsert `(table_name, rows, conflict_keys)` batches, skipping rows already written with identical odds. Rows are split into chunks of UPSERT_CHUNK_SIZE and sent concurrently so one failed chunk does not discard the rest. Invalidate cached reads for each written table, re-raise the first chunk failure, and otherwise return the rows sent per batch.
+    """
+    batches = [
+        (table_name, _filter_unchanged_rows(table_name, rows, conflict_keys), conflict_keys)
+        for table_name, rows, conflict_keys in batches
+    ]
+
+    futures = {}
+    for table_name, rows, conflict_keys in batches:
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            chunk = rows[start:start + UPSERT_CHUNK_SIZE]
+            future = _upsert_executor.submit(_upsert_chunk, table_name, chunk, conflict_keys)
+            futures[future] = (table_name, chunk, conflict_keys)
+
+    errors = []
+    for future in as_completed(futures):
+        try:
+            future.result()
+        except Exception as exc:
+            errors.append(exc)
+            continue
+        _remember_rows(*futures[future])
+
+    for table_name, rows, _ in batches:
+        if rows:
+            cache.invalidate(table_name)
+
+    if errors:
+        raise errors[0]
+    return [rows for _, rows, _ in batches]
+
+
+def _upsert_rows(table_name, rows, conflict_keys):
+    """
+    Input: table_name (str), rows (list[dict]), conflict_keys (str)
+    Output: list[dict]
+    Upsert prepared rows into a single Supabase table. Return the rows actually sent.
+    """
+    return _upsert_batches([(table_name, rows, conflict_keys)])[0]
+
+
+def upsert_moneyline_opportunities(opportunities, min_profit_percent=1.99):
+    """
+    Input: opportunities (list[MoneylineOpp]), min_profit_percent (float)
+    Output: list[dict]
+    Filter and upsert moneyline opportunities that meet the minimum profit threshold. Return the rows sent to Supabase, or an empty list when nothing qualifies or changed.
+    """
+    rows = _build_rows(_format_moneyline_opportunity, opportunities, min_profit_percent)
+    return _upsert_rows(MONEYLINE_ARBITRAGE_TABLE, rows, MONEYLINE_CONFLICT_KEYS)
+
+
+def upsert_prop_opportunities(opportunities, min_profit_percent=1.99):
+    """
+    Input: opportunities (list[PropOpp]), min_profit_percent (float)
+    Output: list[dict]
+    Filter and upsert prop opportunities that meet the minimum profit threshold. Return the rows sent to Supabase, or an empty list when nothing qualifies or changed.
+    """
+    rows = _build_rows(_format_prop_opportunity, opportunities, min_profit_percent)
+    return _upsert_rows(PROP_ARBITRAGE_TABLE, rows, PROP_CONFLICT_KEYS)
 
 
 def upsert_arbitrage_opportunities(opportunities, min_profit_percent=1.99):
     """
-    Input: opportunities (list[dict]), min_profit_percent (float)
+    Input: opportunities (list[MoneylineOpp | PropOpp]), min_profit_percent (float)
     Output: dict[str, list[dict]]
-    Split mixed opportunities into moneyline and prop groups by market type. Upsert each group with the provided threshold and return both result sets.
+    Split mixed opportunities into moneyline and prop groups by market type. Upsert both groups concurrently with the provided threshold and return both result sets.
     """
-    moneyline_opps = [opp for opp in opportunities if opp.get("market_type") == "h2h"]
-    prop_opps = [opp for opp in opportunities if opp.get("market_type") != "h2h"]
+    moneyline_opps = [opp for opp in opportunities if opp.market_type == "h2h"]
+    prop_opps = [opp for opp in opportunities if opp.market_type != "h2h"]
+
+    detected_at = datetime.now(timezone.utc).isoformat()
+    moneyline_rows = _build_rows(_format_moneyline_opportunity, moneyline_opps, min_profit_percent, detected_at)
+    prop_rows = _build_rows(_format_prop_opportunity, prop_opps, min_profit_percent, detected_at)
+
+    moneyline_rows, prop_rows = _upsert_batches(
+        [
+            (MONEYLINE_ARBITRAGE_TABLE, moneyline_rows, MONEYLINE_CONFLICT_KEYS),
+            (PROP_ARBITRAGE_TABLE, prop_rows, PROP_CONFLICT_KEYS),
+        ]
+    )
 
-    moneyline_rows = upsert_moneyline_opportunities(moneyline_opps, min_profit_percent=min_profit_percent)
-    prop_rows = upsert_prop_opportunities(prop_opps, min_profit_percent=min_profit_percent)
     return {"moneyline_rows": moneyline_rows, "prop_rows": prop_rows}
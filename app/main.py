@@ -1,10 +1,27 @@
-from fastapi import FastAPI, Header, HTTPException
+from fastapi import BackgroundTasks, FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 import argparse
+import asyncio
+import time
+from functools import lru_cache
+
+import jwt
 from pydantic import BaseModel
 
-from app.config import CORS_ALLOW_ORIGINS, get_prop_markets
-from app.db import supabase_client
+from app.config import (
+    ARBITRAGE_PAGE_SIZE_DEFAULT,
+    ARBITRAGE_PAGE_SIZE_MAX,
+    AUTH_TOKEN_CACHE_SIZE,
+    CORS_ALLOW_ORIGINS,
+    MONEYLINE_ARBITRAGE_TABLE,
+    MONEYLINE_SELECT_COLUMNS,
+    ODDS_API_MAX_CONCURRENCY,
+    PROP_ARBITRAGE_TABLE,
+    PROP_SELECT_COLUMNS,
+    SUPABASE_JWT_SECRET,
+    get_prop_markets,
+)
+from app.db import cache, supabase_client
 from app.db.supabase_client import supabase
 from app.services import arbitrage_engine, odds_fetcher
 
@@ -24,38 +41,60 @@ class FetchFromApiRequest(BaseModel):
 
 
 @app.get("/arbitrage/moneyline")
-def get_moneyline_arbitrage(min_profit: float = 0.0):
+def get_moneyline_arbitrage(
+    min_profit: float = 0.0,
+    limit: int = Query(ARBITRAGE_PAGE_SIZE_DEFAULT, ge=1, le=ARBITRAGE_PAGE_SIZE_MAX),
+    offset: int = Query(0, ge=0),
+):
     """
-    Input: min_profit (float)
+    Input: min_profit (float), limit (int), offset (int)
     Output: list[dict]
-    Fetch persisted moneyline arbitrage rows from Supabase above a minimum profit threshold. Return rows sorted by descending profit percentage.
+    Fetch one page of persisted moneyline arbitrage rows above a minimum profit threshold, serving from the response cache when warm. Return rows sorted by descending profit percentage.
     """
+    cache_key = f"{min_profit}:{limit}:{offset}"
+    cached_rows = cache.get_cached(MONEYLINE_ARBITRAGE_TABLE, cache_key)
+    if cached_rows is not None:
+        return cached_rows
+
     response = (
         supabase
-        .table("moneyline_arbitrage_opportunities")
-        .select("*")
+        .table(MONEYLINE_ARBITRAGE_TABLE)
+        .select(MONEYLINE_SELECT_COLUMNS)
         .gte("profit_percent", min_profit)
         .order("profit_percent", desc=True)
+        .range(offset, offset + limit - 1)
         .execute()
     )
+    cache.set_cached(MONEYLINE_ARBITRAGE_TABLE, cache_key, response.data)
     return response.data
 
 
 @app.get("/arbitrage/props")
-def get_prop_arbitrage(min_profit: float = 0.0):
+def get_prop_arbitrage(
+    min_profit: float = 0.0,
+    limit: int = Query(ARBITRAGE_PAGE_SIZE_DEFAULT, ge=1, le=ARBITRAGE_PAGE_SIZE_MAX),
+    offset: int = Query(0, ge=0),
+):
     """
-    Input: min_profit (float)
+    Input: min_profit (float), limit (int), offset (int)
     Output: list[dict]
-    Fetch persisted prop arbitrage rows from Supabase above a minimum profit threshold. Return rows sorted by descending profit percentage.
+    Fetch one page of persisted prop arbitrage rows above a minimum profit threshold, serving from the response cache when warm. Return rows sorted by descending profit percentage.
     """
+    cache_key = f"{min_profit}:{limit}:{offset}"
+    cached_rows = cache.get_cached(PROP_ARBITRAGE_TABLE, cache_key)
+    if cached_rows is not None:
+        return cached_rows
+
     response = (
         supabase
-        .table("prop_arbitrage_opportunities")
-        .select("*")
+        .table(PROP_ARBITRAGE_TABLE)
+        .select(PROP_SELECT_COLUMNS)
         .gte("profit_percent", min_profit)
         .order("profit_percent", desc=True)
+        .range(offset, offset + limit - 1)
         .execute()
     )
+    cache.set_cached(PROP_ARBITRAGE_TABLE, cache_key, response.data)
     return response.data
 
 def extract_auth_token(authorization: str | None):
@@ -66,22 +105,59 @@ def extract_auth_token(authorization: str | None):
         raise HTTPException(status_code=401, detail="Missing bearer token.")
     return token
 
-@app.post("/arbitrage/fetch")
-async def fetch_from_api(payload: FetchFromApiRequest, authorization: str | None = Header(default=None)):
+
+@lru_cache(maxsize=AUTH_TOKEN_CACHE_SIZE)
+def _decode_auth_token(token: str):
     """
-    Input: sport (str), market (str), Authorization bearer token
+    Input: token (str)
     Output: dict
-    Trigger arbitrage processing from an authenticated frontend request.
+    Verify a Supabase access token signature locally and return its claims. Successful decodes are cached per token string; failures raise and are not cached.
     """
-    jwt = extract_auth_token(authorization)
+    return jwt.decode(
+        token,
+        SUPABASE_JWT_SECRET,
+        algorithms=["HS256"],
+        audience="authenticated",
+        options={"require": ["exp", "sub"]},
+    )
 
-    try:
-        user_response = supabase.auth.get_user(jwt)
-        user = user_response.user
+
+def verify_auth_token(token: str):
+    """
+    Input: token (str)
+    Output: None
+    Reject tokens that are invalid or expired with a 401. Verify locally against SUPABASE_JWT_SECRET when configured, re-checking expiry on cached claims, and otherwise fall back to Supabase Auth.
+    """
+    if not SUPABASE_JWT_SECRET:
+        try:
+            user = supabase.auth.get_user(token).user
+        except Exception as exc:
+            raise HTTPException(status_code=401, detail="Invalid or expired token.") from exc
         if not user:
             raise HTTPException(status_code=401, detail="Invalid or expired token.")
-    except Exception as exc:
+        return
+
+    try:
+        claims = _decode_auth_token(token)
+    except jwt.InvalidTokenError as exc:
         raise HTTPException(status_code=401, detail="Invalid or expired token.") from exc
+    if claims["exp"] <= time.time():
+        raise HTTPException(status_code=401, detail="Invalid or expired token.")
+
+
+@app.post("/arbitrage/fetch", status_code=202)
+async def fetch_from_api(
+    payload: FetchFromApiRequest,
+    background_tasks: BackgroundTasks,
+    authorization: str | None = Header(default=None),
+):
+    """
+    Input: sport (str), market (str), Authorization bearer token
+    Output: dict
+    Schedule arbitrage processing from an authenticated frontend request. The pipeline runs as a background task after the 202 response is sent.
+    """
+    token = extract_auth_token(authorization)
+    verify_auth_token(token)
 
     sport = payload.sport
     market = payload.market.lower()
@@ -90,18 +166,18 @@ async def fetch_from_api(payload: FetchFromApiRequest, authorization: str | None
         raise HTTPException(status_code=400, detail="Both sport and market are required.")
     
     if market == "prop":
-        fetch_and_process_props(sport)
+        background_tasks.add_task(fetch_and_process_props, sport)
     elif market == "moneyline":
-        fetch_and_process_moneyline(sport)
+        background_tasks.add_task(fetch_and_process_moneyline, sport)
     elif market == "all":
-        fetch_and_process(sport)
+        background_tasks.add_task(fetch_and_process, sport)
     else:
         raise HTTPException(
             status_code=400,
             detail="Invalid market. Use one of: prop, moneyline, all.",
         )
 
-    return {"status": "ok", "sport": sport, "market": market}
+    return {"status": "accepted", "sport": sport, "market": market}
 
 
 
@@ -118,47 +194,69 @@ def root():
 def fetch_moneyline_opportunities(sport_key):
     """
     Input: sport_key (str)
-    Output: tuple[list[dict], dict[str, dict]]
+    Output: tuple[list[MoneylineOpp], dict[str, dict]]
     Fetch and normalize upcoming games, then detect moneyline arbitrage opportunities. Return both opportunities and normalized game data for reuse in prop processing.
     """
-    raw_games = odds_fetcher.fetch_upcoming_games(sport_key)
-    normalized_games = odds_fetcher.normalize_moneyline_odds(raw_games)
+    normalized_games = odds_fetcher.fetch_normalized_moneyline(sport_key)
     moneyline_opps = arbitrage_engine.detect_moneyline_arbitrage(normalized_games)
     return moneyline_opps, normalized_games
 
 
-def fetch_prop_opportunities(sport_key, normalized_games=None):
+async def _fetch_event_props_limited(semaphore, sport_key, game_id, prop_markets):
+    """
+    Input: semaphore (asyncio.Semaphore), sport_key (str), game_id (str), prop_markets (list[str])
+    Output: tuple[dict, int]
+    Fetch event props while holding the shared semaphore. Keeps concurrent prop requests within the Odds API rate limit.
+    """
+    async with semaphore:
+        return await odds_fetcher.fetch_event_props(
+            sport_key=sport_key,
+            event_id=game_id,
+            markets=prop_markets,
+        )
+
+
+async def fetch_prop_opportunities(sport_key, normalized_games=None):
     """
     Input: sport_key (str), normalized_games (dict[str, dict] | None)
-    Output: tuple[list[dict], int]
-    Fetch and process event-level prop odds for each normalized game in the selected sport. Return detected prop opportunities and a count of request failures.
+    Output: tuple[list[PropOpp], int]
+    Fetch event-level prop odds for every normalized game concurrently, then process each payload. Return detected prop opportunities and a count of request failures.
     """
     if normalized_games is None:
-        raw_games = odds_fetcher.fetch_upcoming_games(sport_key)
-        normalized_games = odds_fetcher.normalize_moneyline_odds(raw_games)
+        normalized_games = await asyncio.to_thread(odds_fetcher.fetch_normalized_moneyline, sport_key)
 
     opportunities = []
     prop_markets = get_prop_markets(sport_key)
     prop_request_errors = 0
 
     if prop_markets:
-        for game_id in normalized_games:
-            raw_props, request_errors = odds_fetcher.fetch_event_props(
-                sport_key=sport_key,
-                event_id=game_id,
-                markets=prop_markets,
-            )
+        semaphore = asyncio.Semaphore(ODDS_API_MAX_CONCURRENCY)
+        game_ids = list(normalized_games)
+        results = await asyncio.gather(
+            *(
+                _fetch_event_props_limited(semaphore, sport_key, game_id, prop_markets)
+                for game_id in game_ids
+            ),
+            return_exceptions=True,
+        )
+
+        for game_id, result in zip(game_ids, results):
+            if isinstance(result, Exception):
+                print(f"Skipping props for event {game_id} after request failure. Error: {result!r}.")
+                prop_request_errors += 1
+                continue
+
+            normalized_props, request_errors = result
             prop_request_errors += request_errors
-            if not raw_props:
+            if not normalized_props:
                 continue
 
-            normalized_props = odds_fetcher.normalize_prop_odds(game_id, raw_props)
             prop_opps = arbitrage_engine.detect_prop_arbitrage(normalized_props)
             home_team = normalized_games[game_id]["home_team"]
             away_team = normalized_games[game_id]["away_team"]
             for opp in prop_opps:
-                opp["home_team"] = home_team
-                opp["away_team"] = away_team
+                opp.home_team = home_team
+                opp.away_team = away_team
             opportunities.extend(prop_opps)
 
     return opportunities, prop_request_errors
@@ -178,17 +276,17 @@ def fetch_and_process_moneyline(sport_key):
     return saved_rows
 
 
-def fetch_and_process_props(sport_key):
+async def fetch_and_process_props(sport_key):
     """
     Input: sport_key (str)
     Output: list[dict]
     Run the props pipeline end-to-end for one sport and upsert qualifying rows. Print a short run summary including request error counts.
     """
-    _, normalized_games = fetch_moneyline_opportunities(sport_key)
-    prop_opps, prop_request_errors = fetch_prop_opportunities(
+    _, normalized_games = await asyncio.to_thread(fetch_moneyline_opportunities, sport_key)
+    prop_opps, prop_request_errors = await fetch_prop_opportunities(
         sport_key, normalized_games=normalized_games
     )
-    saved_rows = supabase_client.upsert_prop_opportunities(prop_opps)
+    saved_rows = await asyncio.to_thread(supabase_client.upsert_prop_opportunities, prop_opps)
     print(
         f"Props run complete. Opportunities: {len(prop_opps)}. "
         f"Prop request errors: {prop_request_errors}. Upserted: {len(saved_rows)}."
@@ -196,16 +294,19 @@ def fetch_and_process_props(sport_key):
     return saved_rows
 
 
-def fetch_and_process(sport_key):
+async def fetch_and_process(sport_key):
     """
     Input: sport_key (str)
     Output: None
     Run both moneyline and prop pipelines for one sport using shared normalized game data. Print a combined summary of detected opportunities, request errors, and upsert counts.
     """
-    moneyline_opps, normalized_games = fetch_moneyline_opportunities(sport_key)
-    prop_opps, prop_request_errors = fetch_prop_opportunities(sport_key, normalized_games=normalized_games)
-    moneyline_rows = supabase_client.upsert_moneyline_opportunities(moneyline_opps)
-    prop_rows = supabase_client.upsert_prop_opportunities(prop_opps)
+    moneyline_opps, normalized_games = await asyncio.to_thread(fetch_moneyline_opportunities, sport_key)
+    prop_opps, prop_request_errors = await fetch_prop_opportunities(sport_key, normalized_games=normalized_games)
+    saved_rows = await asyncio.to_thread(
+        supabase_client.upsert_arbitrage_opportunities, moneyline_opps + prop_opps
+    )
+    moneyline_rows = saved_rows["moneyline_rows"]
+    prop_rows = saved_rows["prop_rows"]
     print(
         f"Processed {len(normalized_games)} games. "
         f"Moneyline arbs: {len(moneyline_opps)}. "
@@ -233,6 +334,6 @@ if __name__ == "__main__":
     if args.mode == "moneyline":
         fetch_and_process_moneyline(args.sport)
     elif args.mode == "props":
-        fetch_and_process_props(args.sport)
+        asyncio.run(fetch_and_process_props(args.sport))
     else:
-        fetch_and_process(args.sport)
+        asyncio.run(fetch_and_process(args.sport))
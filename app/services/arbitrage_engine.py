@@ -1,3 +1,40 @@
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class MoneylineOpp:
+    """
+    A detected moneyline arbitrage between the best home and away prices for one game.
+    """
+    game_id: str
+    home_team: str
+    away_team: str
+    profit_percent: float
+    over_book: str
+    under_book: str
+    over_odds: int | float
+    under_odds: int | float
+    market_type: str = "h2h"
+
+
+@dataclass(slots=True)
+class PropOpp:
+    """
+    A detected prop arbitrage between the best Over and Under prices for one player line.
+    """
+    game_id: str
+    market_type: str
+    player_name: str
+    line_value: float
+    profit_percent: float
+    over_book: str
+    under_book: str
+    over_odds: int | float
+    under_odds: int | float
+    home_team: str | None = None
+    away_team: str | None = None
+
+
 def detect_two_way_arbitrage(side_a, side_b):
     """
     Input: side_a (dict | None), side_b (dict | None)
@@ -26,27 +63,31 @@ def _best_price_for_team(game_data, team_name):
     Output: dict | None
     Find the best available odds for a specific team across all books in a game. Return `None` when no qualifying team price is available.
     """
-    best = None
+    best_book = None
+    best_data = None
     for book, teams in game_data.get("books", {}).items():
         team_data = teams.get(team_name)
         if not team_data:
             continue
 
-        odds = team_data["odds"]
-        if best is None or odds > best["odds"]:
-            best = {
-                "book": book,
-                "odds": odds,
-                "implied_prob": team_data["implied_prob"],
-            }
-    return best
+        if best_data is None or team_data["odds"] > best_data["odds"]:
+            best_book = book
+            best_data = team_data
+
+    if best_data is None:
+        return None
+    return {
+        "book": best_book,
+        "odds": best_data["odds"],
+        "implied_prob": best_data["implied_prob"],
+    }
 
 
 def detect_moneyline_arbitrage(games_by_id):
     """
     Input: games_by_id (dict[str, dict])
-    Output: list[dict]
-    Detect moneyline arbitrage opportunities from normalized game odds data. Build standardized opportunity rows for each game where the home and away best prices form an arbitrage.
+    Output: list[MoneylineOpp]
+    Detect moneyline arbitrage opportunities from normalized game odds data. Build an opportunity record for each game where the home and away best prices form an arbitrage.
     """
     opportunities = []
 
@@ -58,15 +99,12 @@ def detect_moneyline_arbitrage(games_by_id):
             continue
 
         opportunities.append(
-            {
-                "game_id": game_id,
-                "market_type": "h2h",
-                "player_name": None,
-                "line_value": None,
-                "home_team": game["home_team"],
-                "away_team": game["away_team"],
+            MoneylineOpp(
+                game_id=game_id,
+                home_team=game["home_team"],
+                away_team=game["away_team"],
                 **arb,
-            }
+            )
         )
 
     return opportunities
@@ -97,8 +135,8 @@ def _best_prop_side(books_data, side_name):
 def detect_prop_arbitrage(normalized_props):
     """
     Input: normalized_props (dict[str, dict])
-    Output: list[dict]
-    Detect prop arbitrage opportunities from normalized per-game prop markets. Return standardized rows for player-line combinations where Over and Under prices create arbitrage.
+    Output: list[PropOpp]
+    Detect prop arbitrage opportunities from normalized per-game prop markets. Return opportunity records for player-line combinations where Over and Under prices create arbitrage.
     """
     opportunities = []
 
@@ -112,15 +150,13 @@ def detect_prop_arbitrage(normalized_props):
                     continue
 
                 opportunities.append(
-                    {
-                        "game_id": game_id,
-                        "market_type": market_type,
-                        "player_name": player_line_data["player"],
-                        "line_value": player_line_data["line"],
-                        "home_team": None,
-                        "away_team": None,
+                    PropOpp(
+                        game_id=game_id,
+                        market_type=market_type,
+                        player_name=player_line_data["player"],
+                        line_value=player_line_data["line"],
                         **arb,
-                    }
+                    )
                 )
 
     return opportunities
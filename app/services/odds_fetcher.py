@@ -1,16 +1,40 @@
+import asyncio
+import hashlib
+import httpx
+import ijson
+import numpy as np
+import orjson
 import requests
-import time
-from requests import HTTPError
+from requests.adapters import HTTPAdapter
 
 from app.config import (
     ODDS_API_BASE_URL,
     ODDS_API_FORMAT,
     ODDS_API_KEY,
+    ODDS_API_MAX_CONCURRENCY,
     ODDS_API_REGION,
+    ODDS_API_STREAM_CHUNK_BYTES,
     ODDS_API_TIMEOUT_SECONDS,
     resolve_sport_key,
 )
 
+VALID_PROP_SIDES = frozenset({"Over", "Under"})
+
+_session = requests.Session()
+_session.mount(
+    "https://",
+    HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=0),
+)
+
+# Last moneyline payload per sport as (etag, content digest, normalized games).
+_moneyline_cache = {}
+
+_async_client = httpx.AsyncClient(
+    http2=True,
+    timeout=ODDS_API_TIMEOUT_SECONDS,
+    limits=httpx.Limits(max_connections=ODDS_API_MAX_CONCURRENCY),
+)
+
 
 def odds_to_probability(odds):
     """
@@ -23,38 +47,101 @@ def odds_to_probability(odds):
     return abs(odds) / (abs(odds) + 100)
 
 
-def _request(path, markets):
+def odds_to_probability_array(odds):
     """
-    Input: path (str), markets (list[str])
-    Output: dict | list
-    Send an HTTP request to The Odds API for the given path and markets. Raise an HTTP error for non-success responses and return the parsed JSON payload.
+    Input: odds (Sequence[int | float] | np.ndarray)
+    Output: np.ndarray
+    Convert a batch of American odds into implied probabilities in one vectorized pass. Matches `odds_to_probability` element for element without dividing by zero on even odds.
+    """
+    odds = np.asarray(odds, dtype=np.float64)
+    return np.where(odds > 0, 100.0, -odds) / (np.abs(odds) + 100.0)
+
+
+def _assign_implied_probs(entries, prices):
+    """
+    Input: entries (list[dict]), prices (list[int | float])
+    Output: None
+    Fill `implied_prob` on each collected odds entry from a single batched conversion of its price.
+    """
+    for entry, implied_prob in zip(entries, odds_to_probability_array(prices).tolist()):
+        entry["implied_prob"] = implied_prob
+
+
+def _request_params(markets):
+    """
+    Input: markets (list[str])
+    Output: dict[str, str]
+    Build the shared Odds API query parameters for a market list. Keeps the sync and async request paths sending identical parameters.
+    """
+    return {
+        "apiKey": ODDS_API_KEY,
+        "regions": ODDS_API_REGION,
+        "markets": ",".join(markets),
+        "oddsFormat": ODDS_API_FORMAT,
+    }
+
+
+def _get(path, markets, headers=None):
     """
-    response = requests.get(
+    Input: path (str), markets (list[str]), headers (dict[str, str] | None)
+    Output: requests.Response
+    Send an HTTP request to The Odds API over the pooled keep-alive session. Raise an HTTP error for non-success responses and return the raw response.
+    """
+    response = _session.get(
         f"{ODDS_API_BASE_URL}{path}",
-        params={
-            "apiKey": ODDS_API_KEY,
-            "regions": ODDS_API_REGION,
-            "markets": ",".join(markets),
-            "oddsFormat": ODDS_API_FORMAT,
-        },
+        params=_request_params(markets),
+        headers=headers,
         timeout=ODDS_API_TIMEOUT_SECONDS,
     )
     response.raise_for_status()
-    return response.json()
+    return response
+
+
+async def _stream_prop_markets(path, markets):
+    """
+    Input: path (str), markets (list[str])
+    Output: dict[str, dict]
+    Stream an event odds payload from The Odds API and normalize each bookmaker as soon as it is parsed. Work is fed in ODDS_API_STREAM_CHUNK_BYTES slices with a yield to the event loop after each, so one payload never holds the loop for longer than a single slice. Raise an HTTP status error for non-success responses and return market buckets without materializing the full JSON document.
+    """
+    game_markets = {}
+    entries = []
+    prices = []
+    bookmakers = ijson.sendable_list()
+    parser = ijson.items_coro(bookmakers, "bookmakers.item", use_float=True)
+
+    async with _async_client.stream(
+        "GET",
+        f"{ODDS_API_BASE_URL}{path}",
+        params=_request_params(markets),
+    ) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes(ODDS_API_STREAM_CHUNK_BYTES):
+            parser.send(chunk)
+            for bookmaker in bookmakers:
+                _normalize_prop_bookmaker(game_markets, bookmaker, entries, prices)
+            del bookmakers[:]
+            await asyncio.sleep(0)
+
+    parser.close()
+    for bookmaker in bookmakers:
+        _normalize_prop_bookmaker(game_markets, bookmaker, entries, prices)
+
+    _assign_implied_probs(entries, prices)
+    return game_markets
 
 
-def _request_with_429_retry(path, markets, max_retries=3):
+async def _request_with_429_retry(path, markets, max_retries=3):
     """
     Input: path (str), markets (list[str]), max_retries (int)
-    Output: dict | list
-    Request Odds API data with retry behavior for HTTP 429 responses. Respect `Retry-After` when provided and otherwise back off exponentially before retrying.
+    Output: dict[str, dict]
+    Stream and normalize event prop markets with retry behavior for HTTP 429 responses. Respect `Retry-After` when provided and otherwise back off exponentially before retrying.
     """
     attempt = 0
     while True:
         try:
-            return _request(path, markets)
-        except HTTPError as exc:
-            status_code = exc.response.status_code if exc.response is not None else None
+            return await _stream_prop_markets(path, markets)
+        except httpx.HTTPStatusError as exc:
+            status_code = exc.response.status_code
             if status_code != 429 or attempt >= max_retries:
                 raise
 
@@ -67,7 +154,7 @@ def _request_with_429_retry(path, markets, max_retries=3):
             if wait_seconds <= 0:
                 wait_seconds = 2 ** attempt
 
-            time.sleep(wait_seconds)
+            await asyncio.sleep(wait_seconds)
             attempt += 1
 
 
@@ -78,14 +165,37 @@ def fetch_upcoming_games(sport_key):
     Fetch upcoming games for a sport using the moneyline market (`h2h`). Resolve aliases first so callers can pass shorthand sport keys.
     """
     sport = resolve_sport_key(sport_key)
-    return _request(f"/sports/{sport}/odds", ["h2h"])
+    return orjson.loads(_get(f"/sports/{sport}/odds", ["h2h"]).content)
 
 
-def fetch_event_props(sport_key, event_id, markets):
+def fetch_normalized_moneyline(sport_key):
+    """
+    Input: sport_key (str)
+    Output: dict[str, dict]
+    Fetch upcoming games and return them in the `normalize_moneyline_odds` shape, reusing the previous result when the payload is unchanged. Send `If-None-Match` when the API supplied an ETag and fall back to a content digest otherwise.
+    """
+    sport = resolve_sport_key(sport_key)
+    cached = _moneyline_cache.get(sport)
+    headers = {"If-None-Match": cached[0]} if cached and cached[0] else None
+
+    response = _get(f"/sports/{sport}/odds", ["h2h"], headers=headers)
+    if cached and response.status_code == 304:
+        return cached[2]
+
+    digest = hashlib.blake2b(response.content, digest_size=16).digest()
+    if cached and cached[1] == digest:
+        normalized = cached[2]
+    else:
+        normalized = normalize_moneyline_odds(orjson.loads(response.content))
+    _moneyline_cache[sport] = (response.headers.get("ETag"), digest, normalized)
+    return normalized
+
+
+async def fetch_event_props(sport_key, event_id, markets):
     """
     Input: sport_key (str), event_id (str), markets (list[str])
-    Output: tuple[dict, int]
-    Fetch prop odds for a single event and market list with 429 retry handling. Return an empty payload and one request error when the fetch ultimately fails.
+    Output: tuple[dict[str, dict], int]
+    Fetch and normalize prop odds for a single event and market list with 429 retry handling. Return props in the `normalize_prop_odds` shape, or an empty payload and one request error when the fetch ultimately fails.
     """
     if not markets:
         return {}, 0
@@ -93,9 +203,9 @@ def fetch_event_props(sport_key, event_id, markets):
     sport = resolve_sport_key(sport_key)
     path = f"/sports/{sport}/events/{event_id}/odds"
     try:
-        return _request_with_429_retry(path, markets), 0
-    except HTTPError as exc:
-        status_code = exc.response.status_code if exc.response is not None else "unknown"
+        return {event_id: await _request_with_429_retry(path, markets)}, 0
+    except httpx.HTTPStatusError as exc:
+        status_code = exc.response.status_code
         print(
             f"Skipping props for event {event_id} after request failure. Status: {status_code}."
         )
@@ -109,6 +219,8 @@ def normalize_moneyline_odds(raw_games):
     Normalize raw moneyline game payloads into a structure keyed by game ID and bookmaker. Include odds and implied probabilities for each team outcome.
     """
     normalized = {}
+    entries = []
+    prices = []
 
     for game in raw_games:
         game_id = game["id"]
@@ -139,63 +251,83 @@ def normalize_moneyline_odds(raw_games):
                 if team is None or odds is None:
                     continue
 
-                teams[team] = {
-                    "odds": odds,
-                    "implied_prob": odds_to_probability(odds),
-                }
+                teams[team] = {"odds": odds}
+                entries.append(teams[team])
+                prices.append(odds)
 
             if teams:
                 game_data["books"][book_name] = teams
 
         normalized[game_id] = game_data
 
+    _assign_implied_probs(entries, prices)
     return normalized
 
 
-def normalize_prop_odds(game_id, raw_event_odds):
+def _normalize_prop_bookmaker(game_markets, bookmaker, entries, prices):
     """
-    Input: game_id (str), raw_event_odds (dict)
-    Output: dict[str, dict]
-    Normalize raw event prop data into game, market, and player-line buckets. Store Over/Under odds and implied probabilities per sportsbook for arbitrage detection.
+    Input: game_markets (dict[str, dict]), bookmaker (dict), entries (list[dict]), prices (list[int | float])
+    Output: None
+    Merge one raw bookmaker's Over/Under outcomes into the game's market and player-line buckets. Collect each new odds entry and its price so implied probabilities can be filled in one batch afterwards.
     """
-    normalized = {game_id: {}}
+    book_name = bookmaker.get("title", bookmaker.get("key"))
+    if not book_name:
+        return
 
-    for bookmaker in raw_event_odds.get("bookmakers", []):
-        book_name = bookmaker.get("title", bookmaker.get("key"))
-        if not book_name:
+    add_entry = entries.append
+    add_price = prices.append
+
+    for market in bookmaker.get("markets", []):
+        market_type = market.get("key")
+        if not market_type:
             continue
 
-        for market in bookmaker.get("markets", []):
-            market_type = market.get("key")
-            if not market_type:
+        market_bucket = game_markets.setdefault(market_type, {})
+        get_entry = market_bucket.get
+
+        for outcome in market.get("outcomes", []):
+            get = outcome.get
+            side = get("name")
+            if side not in VALID_PROP_SIDES:
                 continue
 
-            market_bucket = normalized[game_id].setdefault(market_type, {})
+            player = get("description")
+            line = get("point")
+            odds = get("price")
+            if player is None or line is None or odds is None:
+                continue
 
-            for outcome in market.get("outcomes", []):
-                side = outcome.get("name")
-                player = outcome.get("description")
-                line = outcome.get("point")
-                odds = outcome.get("price")
+            player_line_key = (player, line)
+            entry = get_entry(player_line_key)
+            if entry is None:
+                entry = market_bucket[player_line_key] = {
+                    "player": player,
+                    "line": line,
+                    "books": {},
+                }
 
-                if side not in {"Over", "Under"}:
-                    continue
-                if player is None or line is None or odds is None:
-                    continue
+            books = entry["books"]
+            book_entry = books.get(book_name)
+            if book_entry is None:
+                book_entry = books[book_name] = {}
 
-                player_line_key = f"{player}|{line}"
-                entry = market_bucket.setdefault(
-                    player_line_key,
-                    {
-                        "player": player,
-                        "line": line,
-                        "books": {},
-                    },
-                )
-                book_entry = entry["books"].setdefault(book_name, {})
-                book_entry[side] = {
-                    "odds": odds,
-                    "implied_prob": odds_to_probability(odds),
-                }
+            side_entry = book_entry[side] = {"odds": odds}
+            add_entry(side_entry)
+            add_price(odds)
 
-    return normalized
+
+def normalize_prop_odds(game_id, raw_event_odds):
+    """
+    Input: game_id (str), raw_event_odds (dict)
+    Output: dict[str, dict]
+    Normalize raw event prop data into game, market, and player-line buckets. Store Over/Under odds and implied probabilities per sportsbook for arbitrage detection.
+    """
+    game_markets = {}
+    entries = []
+    prices = []
+
+    for bookmaker in raw_event_odds.get("bookmakers", []):
+        _normalize_prop_bookmaker(game_markets, bookmaker, entries, prices)
+
+    _assign_implied_probs(entries, prices)
+    return {game_id: game_markets}